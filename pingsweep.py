@@ -1,19 +1,62 @@
+import asyncio
+import bisect
 import ipaddress
-import subprocess
+import os
 import platform
 import sys
 import time
 import argparse
+import itertools
+import queue
+import signal
 from concurrent.futures import ThreadPoolExecutor
-from tqdm import tqdm
+from tqdm.asyncio import tqdm
 from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
 from rich.prompt import Prompt, Confirm
-import pandas as pd
+import xlsxwriter
+
+try:
+    import icmplib
+except ImportError:
+    icmplib = None
+
+try:
+    from aiomultiprocess import Pool
+except ImportError:
+    Pool = None
 
 console = Console()
 
+# Resolved once at import: Windows ping takes -n for the count and -w for the timeout in ms
+_IS_WINDOWS = platform.system().lower() == 'windows'
+_PING_CMD_TEMPLATE = ('ping', '-n', '1', '-w', '1000') if _IS_WINDOWS else ('ping', '-c', '1', '-W', '1')
+# Hard limit per ping process, slightly above its own 1s reply timeout, for pings that ignore it
+_PING_PROCESS_TIMEOUT = 2
+
+DEFAULT_TARGET_PPS = 1000
+RESULT_COLUMNS = ["IP Address", "Status"]
+SUMMARY_SHEETS = {"All_Reachable": "Reachable IPs", "All_Unreachable": "Unreachable IPs"}
+# constant_memory keeps a temp file open per sheet, so past this many subnets they share one sheet
+MAX_NETWORK_SHEETS = 100
+COMBINED_SHEET = "Networks"
+COMBINED_COLUMNS = ["Network", *RESULT_COLUMNS]
+ROW_QUEUE_SIZE = 10000
+EXCEL_MAX_ROWS = 1048576
+
+def _default_concurrency():
+    """Default concurrency: twice the CPU count, clamped to a sane range."""
+    return max(64, min(512, (os.cpu_count() or 2) * 2))
+
+def resolve_concurrency(max_threads=None, rtt_ms=None, target_pps=DEFAULT_TARGET_PPS):
+    """Pick the scan concurrency from an explicit value, the RTT (bandwidth-delay product) or the default."""
+    if max_threads:
+        return max_threads
+    if rtt_ms:
+        return max(1, int(rtt_ms / 1000 * target_pps))
+    return _default_concurrency()
+
 def display_banner():
     """Display the geeky banner for Ping Sweeper."""
     banner_text = """
@@ -35,38 +78,414 @@ def display_banner():
     console.print(panel)
     console.print()
 
-def ping_ip(ip):
-    """Ping a single IP and return (IP, is_reachable)."""
-    param = '-n' if platform.system().lower() == 'windows' else '-c'
-    command = ['ping', param, '1', '-W', '1', str(ip)]
+_warned = set()
+
+def _warn_once(message):
+    """Print a warning the first time it occurs, so a systemic failure is visible without flooding the console."""
+    if message not in _warned:
+        _warned.add(message)
+        console.print(f"[yellow]{message}[/yellow]")
+
+def _warn_ping_failure(error):
+    _warn_once(f"Could not run {_PING_CMD_TEMPLATE[0]!r} ({error}); affected hosts are reported as Unreachable")
+
+async def _ping_subprocess_async(ip_str):
+    """Ping with asyncio's subprocess support."""
     try:
-        result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        return str(ip), result.returncode == 0
-    except Exception:
-        return str(ip), False
+        proc = await asyncio.create_subprocess_exec(
+            *_PING_CMD_TEMPLATE, ip_str,
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL
+        )
+    except Exception as e:
+        _warn_ping_failure(e)
+        return ip_str, False
+    try:
+        rc = await asyncio.wait_for(proc.wait(), _PING_PROCESS_TIMEOUT)
+        return ip_str, rc == 0
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        return ip_str, False
+    finally:
+        # Cancelled (e.g. Ctrl+C): don't leave the child running
+        if proc.returncode is None:
+            proc.kill()
+
+_DEVNULL_FILE_ACTIONS = [
+    (os.POSIX_SPAWN_OPEN, fd, os.devnull, os.O_WRONLY, 0) for fd in (1, 2)
+] if hasattr(os, 'POSIX_SPAWN_OPEN') else []
+
+def _pidfd_works():
+    """Whether pidfd_open works here; it can exist and still fail with ENOSYS (Linux < 5.3) or EPERM (seccomp)."""
+    if not hasattr(os, 'pidfd_open'):
+        return False
+    try:
+        os.close(os.pidfd_open(os.getpid()))
+        return True
+    except OSError:
+        return False
+
+_PIDFD_WORKS = _pidfd_works()
+
+def _kill_ping(pid):
+    """Kill and reap a spawned ping so it never lingers as a zombie."""
+    try:
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+    except OSError:
+        pass
+
+async def _poll_ping_exit(pid, timeout):
+    """Poll waitpid with WNOHANG until the deadline, so a stuck ping can't hang the scan."""
+    deadline = time.monotonic() + timeout
+    while True:
+        reaped, status = os.waitpid(pid, os.WNOHANG)
+        if reaped:
+            return os.waitstatus_to_exitcode(status)
+        if time.monotonic() >= deadline:
+            return None
+        await asyncio.sleep(0.01)
+
+async def _wait_ping_exit(pid, timeout):
+    """Wait for a spawned ping to exit without blocking the loop; return its exit code, or None on timeout."""
+    try:
+        pidfd = os.pidfd_open(pid) if _PIDFD_WORKS else None
+    except OSError:
+        pidfd = None
+    if pidfd is None:
+        return await _poll_ping_exit(pid, timeout)
+
+    loop = asyncio.get_running_loop()
+    exited = loop.create_future()
+    loop.add_reader(pidfd, lambda: exited.done() or exited.set_result(None))
+    try:
+        await asyncio.wait_for(exited, timeout)
+    except asyncio.TimeoutError:
+        return None
+    finally:
+        loop.remove_reader(pidfd)
+        os.close(pidfd)
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status)
+
+async def _ping_posix_spawn_async(ip_str):
+    """Linux: posix_spawn ping and await its exit, skipping asyncio's Popen/transport machinery."""
+    try:
+        pid = os.posix_spawnp(_PING_CMD_TEMPLATE[0], [*_PING_CMD_TEMPLATE, ip_str], os.environ,
+                              file_actions=_DEVNULL_FILE_ACTIONS)
+    except Exception as e:
+        _warn_ping_failure(e)
+        return ip_str, False
+    try:
+        rc = await _wait_ping_exit(pid, _PING_PROCESS_TIMEOUT)
+        if rc is None:
+            _kill_ping(pid)
+        return ip_str, rc == 0
+    except Exception as e:
+        _kill_ping(pid)
+        _warn_ping_failure(e)
+        return ip_str, False
+    except BaseException:
+        # Cancelled (e.g. Ctrl+C): don't leave the child running
+        _kill_ping(pid)
+        raise
+
+# Bound once at import so the scan does not re-check the platform per host
+_ping_async = _ping_posix_spawn_async if platform.system() == 'Linux' and _DEVNULL_FILE_ACTIONS else _ping_subprocess_async
+
+async def ping_ip_async(ip_str, sem):
+    """Ping a single IP with the system ping command without blocking the event loop."""
+    async with sem:
+        return await _ping_async(ip_str)
 
 def determine_subnet(entry):
-    """Convert input to subnet. Default to /24 if only IP provided."""
+    """Convert input to subnet. A bare IP is scanned as a single host (/32 or /128)."""
     try:
         if '/' in entry:
             return ipaddress.ip_network(entry.strip(), strict=False)
         else:
             ip = ipaddress.ip_address(entry.strip())
-            return ipaddress.ip_network(f"{ip}/24", strict=False)
+            return ipaddress.ip_network(ip)
     except ValueError as e:
         console.print(f"[red]Invalid IP or CIDR: {entry} - {e}[/red]")
         return None
 
-def scan_network(network, max_threads=100):
-    """Ping all IPs in the subnet."""
-    hosts = list(network.hosts())
-    results = []
+def _icmp_sockets_available(version):
+    """Check whether unprivileged ICMP sockets can be opened for this IP version."""
+    socket_class = icmplib.ICMPv4Socket if version == 4 else icmplib.ICMPv6Socket
+    try:
+        socket_class(privileged=False).close()
+        return True
+    except icmplib.ICMPSocketError:
+        return False
+
+_icmp_usable = {}
+
+def _use_icmp(version):
+    """Whether to ping this IP version through icmplib, probed and warned about once per process."""
+    if icmplib is None:
+        return False
+    if version not in _icmp_usable:
+        _icmp_usable[version] = _icmp_sockets_available(version)
+        if not _icmp_usable[version]:
+            _warn_once(f"ICMP sockets unavailable for IPv{version} (not permitted), falling back to system ping")
+    return _icmp_usable[version]
 
-    with ThreadPoolExecutor(max_workers=max_threads) as executor:
-        for ip, status in tqdm(executor.map(ping_ip, hosts), total=len(hosts), desc=f"Scanning {network}", leave=False):
-            results.append((str(ip), "Reachable" if status else "Unreachable"))
+def _iterate_async(async_iterable):
+    """Drive an async iterator from synchronous code on a main-thread event loop."""
+    loop = asyncio.new_event_loop()
+    iterator = async_iterable.__aiter__()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(iterator.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        # On early exit (e.g. KeyboardInterrupt) cancel in-flight pings before closing the loop
+        pending = asyncio.all_tasks(loop)
+        for task in pending:
+            task.cancel()
+        if pending:
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+def scan_range(chunk, max_threads=None):
+    """Ping every address in a chunk of host ranges, yielding lists of (ip, status) rows as they complete."""
+    # Subprocesses need the event loop to run in the main thread
+    yield from _iterate_async(scan_range_async(chunk, max_threads))
+
+def _host_range(network):
+    """Return the (first, last) integer addresses that network.hosts() would yield."""
+    first = int(network.network_address)
+    last = int(network.broadcast_address)
+    if network.prefixlen < network.max_prefixlen - 1:
+        first += 1
+        if network.version == 4:
+            last -= 1
+    return first, last
+
+def _range_count(host_range):
+    """Number of addresses in a (first, last) host range."""
+    first, last = host_range
+    return int(last) - int(first) + 1
+
+def _format_range(host_range):
+    """Display form of a host range: the address itself, or first-last."""
+    first, last = host_range
+    return str(first) if first == last else f"{first}-{last}"
 
-    return results
+def _chunk_count(chunk):
+    """Number of addresses in a chunk of host ranges."""
+    return sum(map(_range_count, chunk))
+
+def _format_chunk(chunk):
+    """Display form of a chunk: its only range, or its first and last ranges."""
+    if len(chunk) == 1:
+        return _format_range(chunk[0])
+    return f"{_format_range(chunk[0])} ... {_format_range(chunk[-1])} ({len(chunk)} ranges)"
+
+def _status_rows(done):
+    """(ip, status) rows for a set of finished ping_ip_async futures."""
+    rows = []
+    for future in done:
+        host, status = future.result()
+        rows.append((host, "Reachable" if status else "Unreachable"))
+    return rows
+
+def _iter_range(host_range):
+    """Lazily yield the addresses of a (first, last) host range as strings."""
+    first, last = host_range
+    address_class = type(first)
+    for address in range(int(first), int(last) + 1):
+        yield str(address_class(address))
+
+async def scan_range_async(chunk, concurrency=None, icmp=None):
+    """Ping every address in a chunk of same-version (first, last) host ranges from a single event loop.
+
+    The chunk's ranges are chained into one host stream so they share the
+    concurrency budget. icmp says whether to use icmplib; by default it is
+    probed with _use_icmp. Yields a list of (ip, status) rows per multiping
+    batch or per wakeup of the ping window, so callers pay their per-item
+    overhead once per batch.
+    """
+    concurrency = concurrency or _default_concurrency()
+    window = 2 * concurrency
+    hosts = itertools.chain.from_iterable(map(_iter_range, chunk))
+    if icmp is None:
+        icmp = _use_icmp(chunk[0][0].version)
+
+    with tqdm(total=_chunk_count(chunk), desc=f"Scanning {_format_chunk(chunk)}", leave=False) as progress:
+        if icmp:
+            try:
+                # Feed multiping bounded batches so the host list is never fully built
+                while batch := list(itertools.islice(hosts, window)):
+                    hosts_alive = await icmplib.async_multiping(batch, count=1, timeout=1,
+                                                                concurrent_tasks=concurrency, privileged=False)
+                    progress.update(len(batch))
+                    yield [(host.address, "Reachable" if host.is_alive else "Unreachable")
+                           for host in hosts_alive]
+                return
+            except icmplib.ICMPSocketError as e:
+                # e.g. too many open files: retry this batch with system ping
+                hosts = itertools.chain(batch, hosts)
+                _warn_once(f"ICMP sockets failed ({e}), falling back to system ping")
+
+        sem = asyncio.Semaphore(concurrency)
+        pending = set()
+
+        for ip in hosts:
+            pending.add(asyncio.ensure_future(ping_ip_async(ip, sem)))
+            if len(pending) >= window:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                progress.update(len(done))
+                yield _status_rows(done)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            progress.update(len(done))
+            yield _status_rows(done)
+
+def merge_host_ranges(networks):
+    """Merge the host ranges of the subnets so every requested address is scanned exactly once.
+
+    Works on the integer [first, last] bounds from _host_range rather than on
+    CIDRs, so merging never adds or drops network/broadcast addresses.
+    Returns a dict mapping each disjoint (first, last) address pair, IPv4
+    before IPv6, to the subnets that fall inside it.
+    """
+    merged = {}
+    for version, address_class in ((4, ipaddress.IPv4Address), (6, ipaddress.IPv6Address)):
+        intervals = sorted(((*_host_range(network), network) for network in networks if network.version == version),
+                           key=lambda interval: interval[:2])
+        current = []
+        for first, last, network in intervals:
+            if current and first <= current[-1][1] + 1:
+                current[-1][1] = max(current[-1][1], last)
+                current[-1][2].append(network)
+            else:
+                current.append([first, last, [network]])
+        merged.update(((address_class(first), address_class(last)), members) for first, last, members in current)
+    return merged
+
+def partition_results(batches, networks):
+    """Map batches of scan results back onto the source subnets they belong to.
+
+    networks must share one IP version, e.g. the subnets merge_host_ranges
+    recorded for the scanned range. Yields one list per batch of (row, owners)
+    for every result inside at least one subnet, where owners lists those
+    subnets. CIDRs either nest or are disjoint, so owners are found by
+    bisecting on the subnet starts and walking up the enclosing subnets.
+    """
+    ordered = sorted(networks, key=lambda network: (network.network_address, network.prefixlen))
+    starts = [int(network.network_address) for network in ordered]
+    host_ranges = [_host_range(network) for network in ordered]
+    parents = []
+    enclosing = []
+    for index, network in enumerate(ordered):
+        while enclosing and int(ordered[enclosing[-1]].broadcast_address) < starts[index]:
+            enclosing.pop()
+        parents.append(enclosing[-1] if enclosing else -1)
+        enclosing.append(index)
+
+    for batch in batches:
+        partitioned = []
+        for row in batch:
+            address = int(ipaddress.ip_address(row[0]))
+            owners = []
+            # Every subnet holding the address encloses the last subnet starting at or before it
+            index = bisect.bisect_right(starts, address) - 1
+            while index >= 0:
+                first, last = host_ranges[index]
+                if first <= address <= last:
+                    owners.append(ordered[index])
+                index = parents[index]
+            if owners:
+                partitioned.append((row, owners))
+        yield partitioned
+
+async def scan_one(chunk, concurrency=None, icmp=None):
+    """Scan one chunk in a worker process and return pickle-safe (chunk, results)."""
+    return chunk, [row async for batch in scan_range_async(chunk, concurrency, icmp) for row in batch]
+
+async def _scan_ranges_pool(chunks, processes, concurrency, icmp):
+    """Scan chunks in parallel, one event loop and one chunk at a time per worker process."""
+    async with Pool(processes=processes, childconcurrency=1) as pool:
+        scans = [asyncio.ensure_future(pool.apply(scan_one, (chunk, concurrency, icmp[chunk[0][0].version])))
+                 for chunk in chunks]
+        # Hand each chunk over as soon as it finishes rather than buffering for input order
+        for scan in asyncio.as_completed(scans):
+            yield await scan
+
+def chunk_ranges(host_ranges):
+    """Group host ranges into chunks that are each scanned as one host stream.
+
+    Consecutive same-version ranges are chained while the chunk holds at most
+    ROW_QUEUE_SIZE hosts, so lists of bare IPs or small subnets still keep the
+    whole concurrency budget busy. A larger range is a chunk of its own.
+    """
+    chunks = []
+    size = 0
+    for host_range in host_ranges:
+        count = _range_count(host_range)
+        if chunks and size + count <= ROW_QUEUE_SIZE and chunks[-1][-1][0].version == host_range[0].version:
+            chunks[-1].append(host_range)
+            size += count
+        else:
+            chunks.append([host_range])
+            size = count
+    return [tuple(chunk) for chunk in chunks]
+
+def pooled_ranges(host_ranges):
+    """Chunks of host ranges to scan in worker processes; the rest are streamed in-process.
+
+    Workers return a whole chunk at once, so only chunks small enough not to
+    defeat the bounded row queue are sent to them.
+    """
+    if Pool is None:
+        return []
+    small = [chunk for chunk in chunk_ranges(host_ranges) if _chunk_count(chunk) <= ROW_QUEUE_SIZE]
+    return small if len(small) > 1 else []
+
+def scan_ranges(host_ranges, max_threads=None):
+    """Yield (chunk, batches) for each chunk of host ranges, spreading small ones across CPUs when possible.
+
+    batches is an iterable of (ip, status) row lists. Chunks scanned in-process
+    yield them lazily so a huge range is never held in memory; worker processes
+    return each (small) chunk whole, which is split into window-sized batches.
+    """
+    pooled = pooled_ranges(host_ranges)
+    pooled_set = set(pooled)
+    streamed = [chunk for chunk in chunk_ranges(host_ranges) if chunk not in pooled_set]
+
+    if pooled:
+        # Split the concurrency budget across workers so the total stays at max_threads
+        max_threads = max_threads or _default_concurrency()
+        processes = max(1, min(os.cpu_count() or 1, len(pooled), max_threads))
+        # Probe here so workers neither repeat the probe nor the fallback warning
+        icmp = {version: _use_icmp(version) for version in {chunk[0][0].version for chunk in pooled}}
+        console.print(f"[blue]Using {processes} worker processes, {max_threads // processes} concurrent pings each[/blue]")
+        for chunk in pooled:
+            console.print(f"[cyan]Scanning: {_format_chunk(chunk)} ({_chunk_count(chunk)} hosts)[/cyan]")
+        window = 2 * (max_threads // processes)
+        for chunk, rows in _iterate_async(_scan_ranges_pool(pooled, processes, max_threads // processes, icmp)):
+            yield chunk, (rows[i:i + window] for i in range(0, len(rows), window))
+
+    for chunk in streamed:
+        console.print(f"[cyan]Scanning: {_format_chunk(chunk)} ({_chunk_count(chunk)} hosts)[/cyan]")
+        yield chunk, scan_range(chunk, max_threads)
+
+def network_sheets(networks):
+    """Map each multi-host subnet to the name of the sheet its rows are written to.
+
+    Single-host entries only appear in the summary sheets. Beyond
+    MAX_NETWORK_SHEETS subnets they all go to COMBINED_SHEET, whose rows
+    start with a Network column.
+    """
+    subnets = [network for network in networks if network.num_addresses > 1]
+    if len(subnets) > MAX_NETWORK_SHEETS:
+        return dict.fromkeys(subnets, COMBINED_SHEET)
+    return {network: str(network).replace("/", "_")[:31] for network in subnets}
 
 def read_input_file(filepath):
     """Read non-empty lines from input file."""
@@ -77,43 +496,60 @@ def read_input_file(filepath):
         console.print(f"[red]Input file '{filepath}' not found.[/red]")
         sys.exit(1)
 
-def style_and_save_excel(all_results, all_reachable, all_unreachable, output_excel):
-    """Write all sheets to Excel with styling using xlsxwriter."""
-    with pd.ExcelWriter(output_excel, engine='xlsxwriter') as writer:
-        workbook = writer.book
-        header_format = workbook.add_format({
-            'bold': True,
-            'bg_color': '#4472C4',  # Blue
-            'font_color': 'white',
-            'border': 1
-        })
-        cell_format = workbook.add_format({
-            'border': 1
-        })
-
-        # Write each network sheet
-        for sheet_name, df in all_results.items():
-            df.to_excel(writer, sheet_name=sheet_name[:31], index=False)
-            worksheet = writer.sheets[sheet_name[:31]]
-            for col_num, value in enumerate(df.columns.values):
-                worksheet.write(0, col_num, value, header_format)
-            worksheet.set_column(0, len(df.columns)-1, 20, cell_format)
-
-        # Write All_Reachable
-        df_r = pd.DataFrame(all_reachable, columns=["Reachable IPs"])
-        df_r.to_excel(writer, sheet_name="All_Reachable", index=False)
-        ws_r = writer.sheets["All_Reachable"]
-        ws_r.write(0, 0, "Reachable IPs", header_format)
-        ws_r.set_column(0, 0, 25, cell_format)
-
-        # Write All_Unreachable
-        df_u = pd.DataFrame(all_unreachable, columns=["Unreachable IPs"])
-        df_u.to_excel(writer, sheet_name="All_Unreachable", index=False)
-        ws_u = writer.sheets["All_Unreachable"]
-        ws_u.write(0, 0, "Unreachable IPs", header_format)
-        ws_u.set_column(0, 0, 25, cell_format)
+def style_and_save_excel(sheet_names, sheet_queue, output_excel):
+    """Write sheets to Excel with styling using xlsxwriter as lists of (sheet_name, row) items arrive on sheet_queue.
 
-    console.print(f"\n[green]Scan complete! Results saved to:[/green] [bold]{output_excel}[/bold]")
+    Sheets are created up front in sheet_names order followed by the summary
+    sheets, and each row is appended to its sheet as soon as it is received.
+    COMBINED_SHEET, if listed, gets the COMBINED_COLUMNS header.
+    A sheet that reaches Excel's row limit continues in a numbered sheet
+    added at the end. A None on the queue closes the workbook.
+    """
+    drained = False
+    try:
+        # constant_memory streams each row to disk, so rows must be written in order
+        with xlsxwriter.Workbook(output_excel, {'constant_memory': True}) as workbook:
+            header_format = workbook.add_format({
+                'bold': True,
+                'bg_color': '#4472C4',  # Blue
+                'font_color': 'white',
+                'border': 1
+            })
+            cell_format = workbook.add_format({
+                'border': 1
+            })
+
+            def add_sheet(name, header_row, width):
+                worksheet = workbook.add_worksheet(name)
+                worksheet.set_column(0, len(header_row)-1, width, cell_format)
+                worksheet.write_row(0, 0, header_row, header_format)
+                return worksheet
+
+            layouts = {sheet_name: (COMBINED_COLUMNS if sheet_name == COMBINED_SHEET else RESULT_COLUMNS, 20)
+                       for sheet_name in sheet_names}
+            layouts.update((sheet_name, ([header], 25)) for sheet_name, header in SUMMARY_SHEETS.items())
+            # sheet name -> [current worksheet, next row, part number]
+            sheets = {sheet_name: [add_sheet(sheet_name[:31], *layout), 1, 1]
+                      for sheet_name, layout in layouts.items()}
+
+            while (items := sheet_queue.get()) is not None:
+                for sheet_name, row in items:
+                    sheet = sheets[sheet_name]
+                    if sheet[1] >= EXCEL_MAX_ROWS:
+                        # Excel caps a sheet at 1,048,576 rows; continue in Name_2, Name_3, ...
+                        sheet[2] += 1
+                        suffix = f"_{sheet[2]}"
+                        sheet[0] = add_sheet(sheet_name[:31 - len(suffix)] + suffix, *layouts[sheet_name])
+                        sheet[1] = 1
+                    if sheet[0].write_row(sheet[1], 0, row, cell_format) < 0:
+                        raise RuntimeError(f"Could not write {row} to Excel sheet {sheet_name}")
+                    sheet[1] += 1
+            drained = True
+    except BaseException:
+        # Keep consuming so the scanner is never blocked on a full queue
+        while not drained and sheet_queue.get() is not None:
+            pass
+        raise
 
 def interactive_mode():
     """Interactive mode for user-friendly operation."""
@@ -148,16 +584,17 @@ def interactive_mode():
         sys.exit(1)
     
     # Get threading preference
+    default_threads = _default_concurrency()
     max_threads = Prompt.ask(
         "[cyan]Max threads for scanning",
-        default="100",
+        default=str(default_threads),
         show_default=True
     )
     try:
         max_threads = int(max_threads)
     except ValueError:
-        max_threads = 100
-        console.print("[yellow]Invalid thread count, using default: 100[/yellow]")
+        max_threads = default_threads
+        console.print(f"[yellow]Invalid thread count, using default: {default_threads}[/yellow]")
     
     # Get output file preference
     output_excel = Prompt.ask(
@@ -168,7 +605,8 @@ def interactive_mode():
     
     return entries, output_excel, max_threads
 
-def main(input_file=None, output_excel="ping_scan_results.xlsx", max_threads=100, interactive=False):
+def main(input_file=None, output_excel="ping_scan_results.xlsx", max_threads=None, interactive=False,
+         rtt_ms=None, target_pps=DEFAULT_TARGET_PPS):
     display_banner()
     
     if interactive:
@@ -178,38 +616,77 @@ def main(input_file=None, output_excel="ping_scan_results.xlsx", max_threads=100
     else:
         input_file = input("Enter path to input file (e.g., ip_list.txt): ").strip()
         entries = read_input_file(input_file)
+
+    max_threads = resolve_concurrency(max_threads, rtt_ms, target_pps)
+    console.print(f"[blue]Using concurrency: {max_threads}[/blue]")
     
-    all_results = {}
-    all_reachable = []
-    all_unreachable = []
+    reachable_total = 0
+    unreachable_total = 0
     
     start_time = time.time()
     
-    for entry in entries:
-        network = determine_subnet(entry)
-        if not network:
-            continue
+    networks = list(dict.fromkeys(network for network in map(determine_subnet, entries) if network))
+    host_ranges = merge_host_ranges(networks)
+    if len(host_ranges) < len(networks):
+        console.print(f"[blue]Merged {len(networks)} ranges into {len(host_ranges)} non-overlapping ranges[/blue]")
+    sheet_names = network_sheets(networks)
+    if COMBINED_SHEET in sheet_names.values():
+        console.print(f"[blue]More than {MAX_NETWORK_SHEETS} subnets, writing their rows to one "
+                      f"{COMBINED_SHEET} sheet[/blue]")
 
-        console.print(f"[cyan]Scanning: {network} ({len(list(network.hosts()))} hosts)[/cyan]")
-        results = scan_network(network, max_threads)
+    # xlsxwriter is not thread-safe, so a single writer thread owns the workbook.
+    # Rows are streamed to it through a bounded queue, which caps memory use
+    # regardless of subnet size and applies backpressure if Excel falls behind.
+    # Items are batches of up to 2 * max_threads rows; keep roughly ROW_QUEUE_SIZE rows queued
+    sheet_queue = queue.Queue(maxsize=max(1, ROW_QUEUE_SIZE // (2 * max_threads)))
+    with ThreadPoolExecutor(max_workers=1) as excel_executor:
+        excel_job = excel_executor.submit(style_and_save_excel, list(dict.fromkeys(sheet_names.values())),
+                                          sheet_queue, output_excel)
+        try:
+            for scanned, results in scan_ranges(host_ranges, max_threads):
+                covered = [network for host_range in scanned for network in host_ranges[host_range]]
+                reachable_counts = dict.fromkeys(covered, 0)
 
-        df = pd.DataFrame(results, columns=["IP Address", "Status"])
-        sheet_name = str(network).replace("/", "_")[:31]
-        all_results[sheet_name] = df
+                for partitioned in partition_results(results, covered):
+                    items = []
+                    for row, owners in partitioned:
+                        ip, status = row
+                        for network in owners:
+                            sheet_name = sheet_names.get(network)
+                            if sheet_name == COMBINED_SHEET:
+                                items.append((sheet_name, (str(network), *row)))
+                            elif sheet_name:
+                                items.append((sheet_name, row))
+                        if status == "Reachable":
+                            reachable_total += 1
+                            for network in owners:
+                                reachable_counts[network] += 1
+                            items.append(("All_Reachable", (ip,)))
+                        else:
+                            unreachable_total += 1
+                            items.append(("All_Unreachable", (ip,)))
+                    sheet_queue.put(items)
 
-        reachable_count = sum(1 for ip, status in results if status == "Reachable")
-        console.print(f"[green]✓ Found {reachable_count} reachable hosts in {network}[/green]")
+                for network in covered:
+                    console.print(f"[green]✓ Found {reachable_counts[network]} reachable hosts in {network}[/green]")
+        except KeyboardInterrupt:
+            console.print(f"\n[yellow]Interrupted by user, saving the {reachable_total + unreachable_total} "
+                          f"results collected so far[/yellow]")
+            if pooled_ranges(host_ranges):
+                console.print("[yellow]Ranges still running in worker processes are only saved once finished, "
+                              "so their results are lost[/yellow]")
+        finally:
+            sheet_queue.put(None)
 
-        all_reachable.extend([ip for ip, status in results if status == "Reachable"])
-        all_unreachable.extend([ip for ip, status in results if status == "Unreachable"])
+        total_time = time.time() - start_time
+        console.print(f"\n[bold]📊 Scan Summary:[/bold]")
+        console.print(f"[green]Total Reachable: {reachable_total}[/green]")
+        console.print(f"[red]Total Unreachable: {unreachable_total}[/red]")
+        console.print(f"[blue]Total Time: {total_time:.2f} seconds[/blue]")
 
-    total_time = time.time() - start_time
-    console.print(f"\n[bold]📊 Scan Summary:[/bold]")
-    console.print(f"[green]Total Reachable: {len(all_reachable)}[/green]")
-    console.print(f"[red]Total Unreachable: {len(all_unreachable)}[/red]")
-    console.print(f"[blue]Total Time: {total_time:.2f} seconds[/blue]")
-    
-    style_and_save_excel(all_results, all_reachable, all_unreachable, output_excel)
+        excel_job.result()
+
+    console.print(f"\n[green]Scan complete! Results saved to:[/green] [bold]{output_excel}[/bold]")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
@@ -226,8 +703,12 @@ Examples:
     parser.add_argument('-f', '--file', help='Input file containing IP addresses/CIDR ranges')
     parser.add_argument('-o', '--output', default='ping_scan_results.xlsx', 
                        help='Output Excel file (default: ping_scan_results.xlsx)')
-    parser.add_argument('-t', '--threads', type=int, default=100, 
-                       help='Maximum number of threads (default: 100)')
+    parser.add_argument('-t', '--threads', type=int, default=None, 
+                       help='Maximum number of concurrent pings (default: 2x CPU count, 64-512)')
+    parser.add_argument('--rtt-ms', type=float, default=None,
+                       help='Expected round-trip time in ms; sizes concurrency as rtt x pps when -t is not given')
+    parser.add_argument('--pps', type=int, default=DEFAULT_TARGET_PPS,
+                       help=f'Target pings per second used with --rtt-ms (default: {DEFAULT_TARGET_PPS})')
     parser.add_argument('-i', '--interactive', action='store_true', 
                        help='Run in interactive mode')
     
@@ -236,6 +717,6 @@ Examples:
     if args.interactive:
         main(interactive=True)
     elif args.file:
-        main(args.file, args.output, args.threads)
+        main(args.file, args.output, args.threads, rtt_ms=args.rtt_ms, target_pps=args.pps)
     else:
-        main()
\ No newline at end of file
+        main(max_threads=args.threads, rtt_ms=args.rtt_ms, target_pps=args.pps)
\ No newline at end of file
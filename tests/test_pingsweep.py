@@ -0,0 +1,140 @@
+import ipaddress
+import os
+import stat
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pingsweep
+
+
+def networks(*entries):
+    return [pingsweep.determine_subnet(entry) for entry in entries]
+
+
+def scanned_addresses(nets):
+    return [address for host_range in pingsweep.merge_host_ranges(nets)
+            for address in pingsweep._iter_range(host_range)]
+
+
+def test_bare_ips_and_slash31_keep_every_address():
+    nets = networks("10.0.0.0", "10.0.0.1", "10.0.0.2/31")
+    assert scanned_addresses(nets) == ["10.0.0.0", "10.0.0.1", "10.0.0.2", "10.0.0.3"]
+
+    rows = [(address, "Reachable") for address in scanned_addresses(nets)]
+    [partitioned] = pingsweep.partition_results([rows], nets)
+    owners = {row[0]: owners for row, owners in partitioned}
+    assert owners["10.0.0.0"] == [nets[0]]
+    assert owners["10.0.0.1"] == [nets[1]]
+    assert owners["10.0.0.3"] == [nets[2]]
+
+
+def test_adjacent_slash31s_keep_every_address():
+    nets = networks("10.0.0.0/31", "10.0.0.2/31")
+    assert scanned_addresses(nets) == ["10.0.0.0", "10.0.0.1", "10.0.0.2", "10.0.0.3"]
+
+
+def test_256_bare_ips_keep_network_and_broadcast_addresses():
+    nets = networks(*(f"10.0.0.{octet}" for octet in range(256)))
+    assert scanned_addresses(nets) == [f"10.0.0.{octet}" for octet in range(256)]
+
+
+def test_adjacent_slash25s_do_not_add_boundary_addresses():
+    nets = networks("10.0.0.0/25", "10.0.0.128/25")
+    addresses = scanned_addresses(nets)
+    assert "10.0.0.127" not in addresses
+    assert "10.0.0.128" not in addresses
+    assert addresses == [str(host) for net in nets for host in net.hosts()]
+
+
+def test_overlapping_and_mixed_version_ranges():
+    nets = networks("10.0.0.0/24", "10.0.0.0/25", "fe80::1", "fe80::2")
+    assert pingsweep.merge_host_ranges(nets) == {
+        (ipaddress.ip_address("10.0.0.1"), ipaddress.ip_address("10.0.0.254")): [nets[1], nets[0]],
+        (ipaddress.ip_address("fe80::1"), ipaddress.ip_address("fe80::2")): [nets[2], nets[3]],
+    }
+
+
+def test_nested_subnets_all_own_their_addresses():
+    nets = networks("10.0.0.0/24", "10.0.0.0/25", "10.0.0.5", "10.0.0.0/31", "10.0.0.200")
+    [(host_range, members)] = pingsweep.merge_host_ranges(nets).items()
+    rows = [(address, "Reachable") for address in pingsweep._iter_range(host_range)]
+    [partitioned] = pingsweep.partition_results([rows], members)
+    owners = {row[0]: set(owners) for row, owners in partitioned}
+    assert owners["10.0.0.0"] == {nets[3]}
+    assert owners["10.0.0.1"] == {nets[0], nets[1], nets[3]}
+    assert owners["10.0.0.5"] == {nets[0], nets[1], nets[2]}
+    assert owners["10.0.0.127"] == {nets[0]}
+    assert owners["10.0.0.200"] == {nets[0], nets[4]}
+    assert owners["10.0.0.254"] == {nets[0]}
+
+
+@pytest.mark.skipif(os.name != "posix", reason="fake ping is a shell script")
+def test_scan_range_reports_every_merged_address(tmp_path, monkeypatch):
+    fake_ping = tmp_path / "ping"
+    fake_ping.write_text('#!/bin/sh\n[ "$1" = "10.0.0.3" ]\n')
+    fake_ping.chmod(fake_ping.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setattr(pingsweep, "icmplib", None)
+    monkeypatch.setattr(pingsweep, "_PING_CMD_TEMPLATE", (str(fake_ping),))
+
+    [host_range] = pingsweep.merge_host_ranges(networks("10.0.0.0", "10.0.0.1", "10.0.0.2/31"))
+    results = dict(row for batch in pingsweep.scan_range([host_range], 4) for row in batch)
+    assert results == {
+        "10.0.0.0": "Unreachable",
+        "10.0.0.1": "Unreachable",
+        "10.0.0.2": "Unreachable",
+        "10.0.0.3": "Reachable",
+    }
+
+
+def test_small_ranges_are_chained_per_version():
+    nets = networks(*(f"10.0.{octet}.1" for octet in range(16)), "10.1.0.0/16", "fe80::1", "fe80::3")
+    chunks = pingsweep.chunk_ranges(pingsweep.merge_host_ranges(nets))
+    assert [len(chunk) for chunk in chunks] == [16, 1, 2]
+    assert [pingsweep._chunk_count(chunk) for chunk in chunks] == [16, 65534, 2]
+
+
+def test_network_sheets_skip_single_hosts_and_combine_past_the_limit(monkeypatch):
+    nets = networks("10.0.0.1", "10.0.1.0/24", "10.0.2.0/31")
+    assert pingsweep.network_sheets(nets) == {nets[1]: "10.0.1.0_24", nets[2]: "10.0.2.0_31"}
+
+    monkeypatch.setattr(pingsweep, "MAX_NETWORK_SHEETS", 1)
+    assert pingsweep.network_sheets(nets) == dict.fromkeys(nets[1:], pingsweep.COMBINED_SHEET)
+
+
+def test_excel_rows_roll_over_into_continuation_sheets(tmp_path, monkeypatch):
+    import queue
+    import re
+    import zipfile
+
+    monkeypatch.setattr(pingsweep, "EXCEL_MAX_ROWS", 3)
+    output = tmp_path / "results.xlsx"
+    sheet_queue = queue.Queue()
+    sheet_queue.put([("All_Unreachable", (f"10.0.0.{octet}",)) for octet in range(4)])
+    sheet_queue.put([("All_Unreachable", ("10.0.0.4",))])
+    sheet_queue.put(None)
+
+    pingsweep.style_and_save_excel(["10.0.0.0_29"], sheet_queue, str(output))
+
+    with zipfile.ZipFile(output) as workbook:
+        sheet_names = re.findall(r'<sheet name="([^"]+)"', workbook.read("xl/workbook.xml").decode())
+    assert sheet_names == ["10.0.0.0_29", "All_Reachable", "All_Unreachable",
+                           "All_Unreachable_2", "All_Unreachable_3"]
+
+
+@pytest.mark.skipif(not hasattr(os, "pidfd_open"), reason="needs os.pidfd_open to simulate its failure")
+def test_pidfd_open_failure_falls_back_to_polling(monkeypatch):
+    import errno
+
+    def unavailable(pid):
+        raise OSError(errno.ENOSYS, "Function not implemented")
+
+    monkeypatch.setattr(pingsweep, "icmplib", None)
+    monkeypatch.setattr(pingsweep, "_PING_CMD_TEMPLATE", ("true",))
+    monkeypatch.setattr(os, "pidfd_open", unavailable)
+
+    host_range = (ipaddress.ip_address("10.0.0.1"), ipaddress.ip_address("10.0.0.6"))
+    batches = pingsweep.scan_range([host_range], 4)
+    assert set(status for batch in batches for _, status in batch) == {"Reachable"}